@@ -8,6 +8,7 @@ from .attention import (
     EcaModule,
     GCTModule,
     CoordAttModule,
+    flash_attn_with_bias,
 )
 from .blocks import (
     nms,
@@ -35,6 +36,7 @@ from .blocks import (
 )
 from .regularization import (
     drop_path,
+    drop_path_rates,
     dropblock,
     DropBlock,
     DropPath,
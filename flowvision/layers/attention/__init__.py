@@ -7,3 +7,4 @@ from .bam import BAMModule
 from .global_context import GlobalContext
 from .coordatt import CoordAttModule
 from .gct import GCTModule
+from .flash_attn import flash_attn_with_bias
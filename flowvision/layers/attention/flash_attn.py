@@ -0,0 +1,91 @@
+import inspect
+import warnings
+
+import oneflow as flow
+import oneflow.nn.functional as F
+
+_FUSED_ATTN_DTYPES = (flow.float16, flow.bfloat16, flow.float32)
+
+
+def _sdpa_accepts_scale():
+    sdpa = getattr(F, "scaled_dot_product_attention", None)
+    if sdpa is None:
+        return False
+    try:
+        params = inspect.signature(sdpa).parameters
+    except (TypeError, ValueError):
+        # builtin without an introspectable signature, decided on the first fused call
+        return None
+    return "attn_mask" in params and "scale" in params
+
+
+# True / False once known whether the installed build's fused op takes ``attn_mask`` and ``scale``
+_fused_attn_supported = _sdpa_accepts_scale()
+
+
+def _fused_attn_available(q, bias):
+    if _fused_attn_supported is False or not q.is_cuda:
+        return False
+    if q.dtype not in _FUSED_ATTN_DTYPES:
+        return False
+    return bias is None or bias.dtype == q.dtype
+
+
+def _explicit_attn(q, k, v, bias, scale, dropout_p):
+    attn = flow.matmul(q * scale, k.transpose(-2, -1))
+    if bias is not None:
+        attn = attn + bias
+    attn = attn.softmax(dim=-1)
+    if dropout_p > 0.0:
+        attn = F.dropout(attn, p=dropout_p, training=True)
+    return flow.matmul(attn, v)
+
+
+def _fused_attn(q, k, v, bias, scale, dropout_p):
+    global _fused_attn_supported
+    if _fused_attn_supported:
+        return F.scaled_dot_product_attention(
+            q, k, v, attn_mask=bias, dropout_p=dropout_p, scale=scale
+        )
+    try:
+        out = F.scaled_dot_product_attention(
+            q, k, v, attn_mask=bias, dropout_p=dropout_p, scale=scale
+        )
+    except TypeError:
+        _fused_attn_supported = False
+        warnings.warn(
+            "scaled_dot_product_attention of this OneFlow build does not accept "
+            "attn_mask/scale, falling back to explicit attention"
+        )
+        return None
+    _fused_attn_supported = True
+    return out
+
+
+def flash_attn_with_bias(
+    q, k, v, bias=None, scale=None, dropout_p=0.0, training=False, use_fused=True
+):
+    """Scaled dot-product attention with an optional additive bias (e.g. relative position bias).
+    With ``use_fused=True`` the computation is dispatched to OneFlow's fused
+    ``scaled_dot_product_attention`` for CUDA inputs when the installed build provides it, so the
+    N x N score matrix never round-trips through global memory. Support for the fused op is decided
+    once per process from its signature; CPU inputs, other dtypes and a bias whose dtype differs
+    from ``q`` use the explicit ``softmax(q @ k^T * scale + bias) @ v`` chain.
+    Args:
+        q, k, v: query, key and value of shape (..., N, head_dim)
+        bias: additive attention bias broadcastable to (..., N, N). Default: ``None``
+        scale: scale applied to the logits. Default: ``head_dim ** -0.5``
+        dropout_p: dropout ratio of attention weight. Default: ``0.0``
+        training: dropout is only applied when True. Default: ``False``
+        use_fused: try the fused kernel before the explicit chain. Default: ``True``
+    """
+    if scale is None:
+        scale = q.shape[-1] ** -0.5
+    if not training:
+        dropout_p = 0.0
+
+    if use_fused and _fused_attn_available(q, bias):
+        out = _fused_attn(q, k, v, bias, scale, dropout_p)
+        if out is not None:
+            return out
+    return _explicit_attn(q, k, v, bias, scale, dropout_p)
@@ -1,4 +1,4 @@
 from .dropblock import DropBlock
-from .droppath import DropPath, drop_path
+from .droppath import DropPath, drop_path, drop_path_rates
 from .norm import LayerNorm2d
 from .stochastic_depth import stochastic_depth, StochasticDepth
@@ -27,6 +27,14 @@ def drop_path(x, drop_prob: float = 0.5, training: bool = False):
     return output
 
 
+def drop_path_rates(drop_path_rate, depth):
+    """Stochastic depth decay rule: ``depth`` drop path rates spaced linearly from 0 to ``drop_path_rate``.
+    Same values as ``flow.linspace(0, drop_path_rate, depth)``, but computed on the host so building
+    a model does not sync with the device once per block.
+    """
+    return [drop_path_rate * i / max(1, depth - 1) for i in range(depth)]
+
+
 class DropPath(nn.Module):
     """Drop paths (Stochastic Depth) per sample  (when applied in main path of residual blocks).
     """
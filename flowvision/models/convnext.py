@@ -6,7 +6,7 @@ import oneflow as flow
 import oneflow.nn as nn
 import oneflow.nn.functional as F
 
-from flowvision.layers import trunc_normal_, DropPath
+from flowvision.layers import trunc_normal_, DropPath, drop_path_rates
 from .registry import ModelCreator
 from .utils import load_state_dict_from_url
 
@@ -122,7 +122,7 @@ class ConvNeXt(nn.Module):
         self.stages = (
             nn.ModuleList()
         )  # 4 feature resolution stages, each consisting of multiple residual blocks
-        dp_rates = [x.item() for x in flow.linspace(0, drop_path_rate, sum(depths))]
+        dp_rates = drop_path_rates(drop_path_rate, sum(depths))
         cur = 0
         for i in range(4):
             stage = nn.Sequential(
@@ -192,7 +192,7 @@ class ConvNeXtIsotropic(nn.Module):
         super().__init__()
 
         self.stem = nn.Conv2d(in_chans, dim, kernel_size=16, stride=16)
-        dp_rates = [x.item() for x in flow.linspace(0, drop_path_rate, depth)]
+        dp_rates = drop_path_rates(drop_path_rate, depth)
         self.blocks = nn.Sequential(
             *[
                 Block(
@@ -4,7 +4,7 @@ Modified from https://github.com/cheerss/CrossFormer/blob/main/models/crossforme
 import oneflow as flow
 import oneflow.nn as nn
 
-from flowvision.layers import DropPath, trunc_normal_
+from flowvision.layers import DropPath, trunc_normal_, drop_path_rates
 from .registry import ModelCreator
 from .utils import load_state_dict_from_url
 
@@ -595,9 +595,7 @@ class CrossFormer(nn.Module):
         self.pos_drop = nn.Dropout(p=drop_rate)
 
         # stochastic depth
-        dpr = [
-            x.item() for x in flow.linspace(0, drop_path_rate, sum(depths))
-        ]  # stochastic depth decay rule
+        dpr = drop_path_rates(drop_path_rate, sum(depths))
 
         # build layers
         self.layers = nn.ModuleList()
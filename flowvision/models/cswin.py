@@ -7,7 +7,7 @@ import numpy as np
 import oneflow as flow
 import oneflow.nn as nn
 
-from flowvision.layers import DropPath, trunc_normal_
+from flowvision.layers import DropPath, trunc_normal_, drop_path_rates
 from .utils import load_state_dict_from_url
 from .registry import ModelCreator
 
@@ -356,9 +356,7 @@ class CSWinTransformer(nn.Module):
 
         curr_dim = embed_dim
         # stochastic depth
-        dpr = [
-            x.item() for x in flow.linspace(0, drop_path_rate, sum(depth))
-        ]  # stochastic depth decay rule
+        dpr = drop_path_rates(drop_path_rate, sum(depth))  # stochastic depth decay rule
         self.stage1 = nn.ModuleList(
             [
                 CSWinBlock(
@@ -10,7 +10,7 @@ import oneflow.nn.functional as F
 from functools import partial
 
 from .vision_transformer import Mlp, PatchEmbed
-from ..layers import DropPath, trunc_normal_
+from ..layers import DropPath, trunc_normal_, flash_attn_with_bias
 from .utils import load_state_dict_from_url
 from .registry import ModelCreator
 
@@ -39,6 +39,13 @@ def to_2tuple(x):
     return tuple(repeat(x, 2))
 
 
+def _layer_scale_residual(x, gamma, y, drop_path):
+    # x + drop_path(gamma * y), a single addcmul kernel whenever drop path is inactive
+    if isinstance(drop_path, nn.Identity) or not drop_path.training:
+        return oneflow.addcmul(x, gamma, y)
+    return x + drop_path(gamma * y)
+
+
 class Attention(nn.Module):
     # taken from https://github.com/rwightman/pytorch-image-models/blob/master/timm/models/vision_transformer.py
     def __init__(
@@ -49,11 +56,13 @@ class Attention(nn.Module):
         qk_scale=None,
         attn_drop=0.0,
         proj_drop=0.0,
+        use_flash=False,
     ):
         super().__init__()
         self.num_heads = num_heads
         head_dim = dim // num_heads
         self.scale = qk_scale or head_dim ** -0.5
+        self.use_flash = use_flash
 
         self.qkv = nn.Linear(dim, dim * 3, bias=qkv_bias)
         self.attn_drop = nn.Dropout(attn_drop)
@@ -69,13 +78,16 @@ class Attention(nn.Module):
         )
         q, k, v = qkv[0], qkv[1], qkv[2]
 
-        q = q * self.scale
-
-        attn = q @ k.transpose(-2, -1)
-        attn = attn.softmax(dim=-1)
-        attn = self.attn_drop(attn)
-
-        x = (attn @ v).transpose(1, 2).reshape(B, N, C)
+        x = flash_attn_with_bias(
+            q,
+            k,
+            v,
+            scale=self.scale,
+            dropout_p=self.attn_drop.p,
+            training=self.training,
+            use_fused=self.use_flash,
+        )
+        x = x.transpose(1, 2).reshape(B, N, C)
         x = self.proj(x)
         x = self.proj_drop(x)
         return x
@@ -98,6 +110,7 @@ class Block(nn.Module):
         Attention_block=Attention,
         Mlp_block=Mlp,
         init_values=1e-4,
+        use_flash=False,
     ):
         super().__init__()
         self.norm1 = norm_layer(dim)
@@ -108,6 +121,7 @@ class Block(nn.Module):
             qk_scale=qk_scale,
             attn_drop=attn_drop,
             proj_drop=drop,
+            use_flash=use_flash,
         )
         # NOTE: drop path for stochastic depth, we shall see if this is better than dropout here
         self.drop_path = DropPath(drop_path) if drop_path > 0.0 else nn.Identity()
@@ -144,6 +158,7 @@ class Layer_scale_init_Block(nn.Module):
         Attention_block=Attention,
         Mlp_block=Mlp,
         init_values=1e-4,
+        use_flash=False,
     ):
         super().__init__()
         self.norm1 = norm_layer(dim)
@@ -154,6 +169,7 @@ class Layer_scale_init_Block(nn.Module):
             qk_scale=qk_scale,
             attn_drop=attn_drop,
             proj_drop=drop,
+            use_flash=use_flash,
         )
         # NOTE: drop path for stochastic depth, we shall see if this is better than dropout here
         self.drop_path = DropPath(drop_path) if drop_path > 0.0 else nn.Identity()
@@ -173,8 +189,12 @@ class Layer_scale_init_Block(nn.Module):
         )
 
     def forward(self, x):
-        x = x + self.drop_path(self.gamma_1 * self.attn(self.norm1(x)))
-        x = x + self.drop_path(self.gamma_2 * self.mlp(self.norm2(x)))
+        x = _layer_scale_residual(
+            x, self.gamma_1, self.attn(self.norm1(x)), self.drop_path
+        )
+        x = _layer_scale_residual(
+            x, self.gamma_2, self.mlp(self.norm2(x)), self.drop_path
+        )
         return x
 
 
@@ -196,6 +216,7 @@ class Layer_scale_init_Block_paralx2(nn.Module):
         Attention_block=Attention,
         Mlp_block=Mlp,
         init_values=1e-4,
+        use_flash=False,
     ):
         super().__init__()
         self.norm1 = norm_layer(dim)
@@ -207,6 +228,7 @@ class Layer_scale_init_Block_paralx2(nn.Module):
             qk_scale=qk_scale,
             attn_drop=attn_drop,
             proj_drop=drop,
+            use_flash=use_flash,
         )
         # NOTE: drop path for stochastic depth, we shall see if this is better than dropout here
         self.attn1 = Attention_block(
@@ -216,6 +238,7 @@ class Layer_scale_init_Block_paralx2(nn.Module):
             qk_scale=qk_scale,
             attn_drop=attn_drop,
             proj_drop=drop,
+            use_flash=use_flash,
         )
         self.drop_path = DropPath(drop_path) if drop_path > 0.0 else nn.Identity()
         self.norm2 = norm_layer(dim)
@@ -247,15 +270,17 @@ class Layer_scale_init_Block_paralx2(nn.Module):
         )
 
     def forward(self, x):
-        x = (
-            x
-            + self.drop_path(self.gamma_1 * self.attn(self.norm1(x)))
-            + self.drop_path(self.gamma_1_1 * self.attn1(self.norm11(x)))
+        y = _layer_scale_residual(
+            x, self.gamma_1, self.attn(self.norm1(x)), self.drop_path
         )
-        x = (
-            x
-            + self.drop_path(self.gamma_2 * self.mlp(self.norm2(x)))
-            + self.drop_path(self.gamma_2_1 * self.mlp1(self.norm21(x)))
+        x = _layer_scale_residual(
+            y, self.gamma_1_1, self.attn1(self.norm11(x)), self.drop_path
+        )
+        y = _layer_scale_residual(
+            x, self.gamma_2, self.mlp(self.norm2(x)), self.drop_path
+        )
+        x = _layer_scale_residual(
+            y, self.gamma_2_1, self.mlp1(self.norm21(x)), self.drop_path
         )
         return x
 
@@ -278,6 +303,7 @@ class Block_paralx2(nn.Module):
         Attention_block=Attention,
         Mlp_block=Mlp,
         init_values=1e-4,
+        use_flash=False,
     ):
         super().__init__()
         self.norm1 = norm_layer(dim)
@@ -289,6 +315,7 @@ class Block_paralx2(nn.Module):
             qk_scale=qk_scale,
             attn_drop=attn_drop,
             proj_drop=drop,
+            use_flash=use_flash,
         )
         # NOTE: drop path for stochastic depth, we shall see if this is better than dropout here
         self.attn1 = Attention_block(
@@ -298,6 +325,7 @@ class Block_paralx2(nn.Module):
             qk_scale=qk_scale,
             attn_drop=attn_drop,
             proj_drop=drop,
+            use_flash=use_flash,
         )
         self.drop_path = DropPath(drop_path) if drop_path > 0.0 else nn.Identity()
         self.norm2 = norm_layer(dim)
@@ -374,6 +402,9 @@ class vit_models(nn.Module):
     """ Vision Transformer with LayerScale (https://arxiv.org/abs/2103.17239) support
     taken from https://github.com/rwightman/pytorch-image-models/blob/master/timm/models/vision_transformer.py
     with slight modifications
+
+    Set ``use_flash=True`` to compute attention with the fused kernel of ``flash_attn_with_bias``
+    when available.
     """
 
     def __init__(
@@ -401,6 +432,7 @@ class vit_models(nn.Module):
         dpr_constant=True,
         init_scale=1e-4,
         mlp_ratio_clstk=4.0,
+        use_flash=False,
     ):
         super().__init__()
 
@@ -438,6 +470,7 @@ class vit_models(nn.Module):
                     Attention_block=Attention_block,
                     Mlp_block=Mlp_block,
                     init_values=init_scale,
+                    use_flash=use_flash,
                 )
                 for i in range(depth)
             ]
@@ -8,7 +8,7 @@ import oneflow as flow
 import oneflow.nn as nn
 import oneflow.nn.functional as F
 
-from flowvision.layers import trunc_normal_, DropPath
+from flowvision.layers import trunc_normal_, DropPath, drop_path_rates
 from .utils import load_state_dict_from_url
 from .registry import ModelCreator
 from .helpers import to_2tuple
@@ -216,9 +216,7 @@ class PyramidVisionTransformer(nn.Module):
         self.num_stages = num_stages
 
         # stochastic depth
-        dpr = [
-            x.item() for x in flow.linspace(0, drop_path_rate, sum(depths))
-        ]  # stochastic depth decay rule
+        dpr = drop_path_rates(drop_path_rate, sum(depths))
         cur = 0
 
         for i in range(num_stages):
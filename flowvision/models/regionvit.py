@@ -9,7 +9,7 @@ import oneflow as flow
 import oneflow.nn as nn
 import oneflow.nn.functional as F
 
-from flowvision.layers import LayerNorm2d, DropPath, Mlp, trunc_normal_
+from flowvision.layers import LayerNorm2d, DropPath, Mlp, trunc_normal_, drop_path_rates
 from .helpers import to_2tuple
 from .utils import load_state_dict_from_url
 from .registry import ModelCreator
@@ -591,10 +591,7 @@ class RegionViT(nn.Module):
             patch_conv_type="linear",
         )
         self.pos_drop = nn.Dropout(p=drop_rate)
-        total_depth = sum(depth)
-        dpr = [
-            x.item() for x in flow.linspace(0, drop_path_rate, total_depth)
-        ]  # stochastic depth decay rule
+        dpr = drop_path_rates(drop_path_rate, sum(depth))  # stochastic depth decay rule
         dpr_ptr = 0
         self.layers = nn.ModuleList()
         for i in range(len(embed_dim) - 1):
@@ -4,8 +4,9 @@ Modified from https://github.com/microsoft/Swin-Transformer/blob/main/models/swi
 
 import oneflow as flow
 import oneflow.nn as nn
+import oneflow.nn.functional as F
 
-from flowvision.layers import trunc_normal_
+from flowvision.layers import trunc_normal_, flash_attn_with_bias, drop_path_rates
 from .registry import ModelCreator
 from .utils import load_state_dict_from_url
 
@@ -78,6 +79,25 @@ def window_reverse(windows, window_size, H, W):
     return x
 
 
+def gen_relative_position_index(window_size):
+    """Pair-wise relative position index of the tokens inside a window, of shape (Wh*Ww, Wh*Ww).
+    Built from two broadcast subtractions instead of meshgrid + in-place slice updates.
+    Values stay below (2*Wh-1) * (2*Ww-1), so int32 is enough and halves the gather index traffic.
+    """
+    Wh, Ww = window_size
+    coords_h = flow.arange(Wh, dtype=flow.int32)
+    coords_w = flow.arange(Ww, dtype=flow.int32)
+    # shift to start from 0 and flatten (dh, dw) into a single table row
+    relative_h = (coords_h[:, None] - coords_h[None, :] + Wh - 1) * (
+        2 * Ww - 1
+    )  # Wh, Wh
+    relative_w = coords_w[:, None] - coords_w[None, :] + Ww - 1  # Ww, Ww
+    relative_position_index = (
+        relative_h[:, None, :, None] + relative_w[None, :, None, :]
+    )  # Wh, Ww, Wh, Ww
+    return relative_position_index.reshape(Wh * Ww, Wh * Ww)
+
+
 class Mlp(nn.Module):
     def __init__(
         self,
@@ -115,6 +135,7 @@ class WindowAttention(nn.Module):
         qk_scale (float | None, optional): Override default qk scale of head_dim ** -0.5 if set
         attn_drop (float, optional): Dropout ratio of attention weight. Default: ``0.0``
         proj_drop (float, optional): Dropout ratio of output. Default: ``0.0``
+        use_flash (bool, optional): If True, compute attention with the fused kernel of ``flash_attn_with_bias``. Default: ``False``
     """
 
     def __init__(
@@ -126,6 +147,7 @@ class WindowAttention(nn.Module):
         qk_scale=None,
         attn_drop=0.0,
         proj_drop=0.0,
+        use_flash=False,
     ):
 
         super().__init__()
@@ -134,6 +156,7 @@ class WindowAttention(nn.Module):
         self.num_heads = num_heads
         head_dim = dim // num_heads
         self.scale = qk_scale or head_dim ** -0.5
+        self.use_flash = use_flash
 
         # define a parameter table of relative position bias
         self.relative_position_bias_table = nn.Parameter(
@@ -141,18 +164,7 @@ class WindowAttention(nn.Module):
         )  # 2*Wh-1 * 2*Ww-1, nH
 
         # get pair-wise relative position index for each token inside the window
-        coords_h = flow.arange(self.window_size[0])
-        coords_w = flow.arange(self.window_size[1])
-        coords = flow.stack(flow.meshgrid(*[coords_h, coords_w]))  # 2, Wh, Ww
-        coords_flatten = flow.flatten(coords, 1)  # 2, Wh*Ww
-        relative_coords = (
-            coords_flatten[:, :, None] - coords_flatten[:, None, :]
-        )  # 2, Wh*Ww, Wh*Ww
-        relative_coords = relative_coords.permute(1, 2, 0)  # Wh*Ww, Wh*Ww, 2
-        relative_coords[:, :, 0] += self.window_size[0] - 1  # shift to start from 0
-        relative_coords[:, :, 1] += self.window_size[1] - 1
-        relative_coords[:, :, 0] *= 2 * self.window_size[1] - 1
-        relative_position_index = relative_coords.sum(-1)  # Wh*Ww, Wh*Ww
+        relative_position_index = gen_relative_position_index(self.window_size)
         self.register_buffer("relative_position_index", relative_position_index)
 
         self.qkv = nn.Linear(dim, dim * 3, bias=qkv_bias)
@@ -163,6 +175,25 @@ class WindowAttention(nn.Module):
         trunc_normal_(self.relative_position_bias_table, std=0.02)
         self.softmax = nn.Softmax(dim=-1)
 
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # checkpoints store the index as int64, copy_ into the int32 buffer does not cast
+        index_key = prefix + "relative_position_index"
+        if index_key in state_dict:
+            state_dict[index_key] = state_dict[index_key].to(
+                self.relative_position_index.dtype
+            )
+        return super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def _get_rel_pos_bias(self):
+        # computed once per forward and shared by every window of the batch
+        relative_position_bias = F.embedding(
+            self.relative_position_index, self.relative_position_bias_table
+        )  # Wh*Ww,Wh*Ww,nH
+        relative_position_bias = relative_position_bias.permute(
+            2, 0, 1
+        )  # nH, Wh*Ww, Wh*Ww
+        return relative_position_bias.unsqueeze(0)
+
     def forward(self, x, mask=None):
         """
         Args:
@@ -177,20 +208,34 @@ class WindowAttention(nn.Module):
         )
         q, k, v = qkv[0], qkv[1], qkv[2]
 
+        relative_position_bias = self._get_rel_pos_bias()  # 1, nH, Wh*Ww, Wh*Ww
+
+        if self.use_flash:
+            bias = relative_position_bias
+            if mask is not None:
+                # fold windows into the head axis so the bias only broadcasts over batch
+                nW = mask.shape[0]
+                bias = (bias + mask.unsqueeze(1)).view(1, nW * self.num_heads, N, N)
+                q, k, v = [
+                    t.reshape(B_ // nW, nW * self.num_heads, N, -1) for t in (q, k, v)
+                ]
+            x = flash_attn_with_bias(
+                q,
+                k,
+                v,
+                bias,
+                scale=self.scale,
+                dropout_p=self.attn_drop.p,
+                training=self.training,
+            )
+            x = x.reshape(B_, self.num_heads, N, -1).transpose(1, 2).reshape(B_, N, C)
+            x = self.proj(x)
+            x = self.proj_drop(x)
+            return x
+
         q = q * self.scale
         attn = flow.matmul(q, k.transpose(-2, -1))
-
-        relative_position_bias = self.relative_position_bias_table[
-            self.relative_position_index.view(-1)
-        ].view(
-            self.window_size[0] * self.window_size[1],
-            self.window_size[0] * self.window_size[1],
-            -1,
-        )  # Wh*Ww,Wh*Ww,nH
-        relative_position_bias = relative_position_bias.permute(
-            2, 0, 1
-        )  # nH, Wh*Ww, Wh*Ww
-        attn = attn + relative_position_bias.unsqueeze(0)
+        attn = attn + relative_position_bias
 
         if mask is not None:
             nW = mask.shape[0]
@@ -226,6 +271,7 @@ class SwinTransformerBlock(nn.Module):
         drop_path (float, optional): Stochastic depth rate. Default: ``0.0``
         act_layer (nn.Module, optional): Activation layer. Default: ``nn.GELU``
         norm_layer (nn.Module, optional): Normalization layer.  Default: ``nn.LayerNorm``
+        use_flash (bool, optional): If True, use the fused attention kernel. Default: ``False``
     """
 
     def __init__(
@@ -243,6 +289,7 @@ class SwinTransformerBlock(nn.Module):
         drop_path=0.0,
         act_layer=nn.GELU,
         norm_layer=nn.LayerNorm,
+        use_flash=False,
     ):
         super().__init__()
         self.dim = dim
@@ -268,6 +315,7 @@ class SwinTransformerBlock(nn.Module):
             qk_scale=qk_scale,
             attn_drop=attn_drop,
             proj_drop=drop,
+            use_flash=use_flash,
         )
 
         self.drop_path = DropPath(drop_path) if drop_path > 0.0 else nn.Identity()
@@ -467,6 +515,7 @@ class BasicLayer(nn.Module):
         norm_layer (nn.Module, optional): Normalization layer. Default: ``nn.LayerNorm``
         downsample (nn.Module | None, optional): Downsample layer at the end of the layer. Default: ``None``
         use_checkpoint (bool): Whether to use checkpointing to save memory. Default: ``False``
+        use_flash (bool): If True, use the fused attention kernel. Default: ``False``
     """
 
     def __init__(
@@ -485,6 +534,7 @@ class BasicLayer(nn.Module):
         norm_layer=nn.LayerNorm,
         downsample=None,
         use_checkpoint=False,
+        use_flash=False,
     ):
 
         super().__init__()
@@ -511,6 +561,7 @@ class BasicLayer(nn.Module):
                     if isinstance(drop_path, list)
                     else drop_path,
                     norm_layer=norm_layer,
+                    use_flash=use_flash,
                 )
                 for i in range(depth)
             ]
@@ -559,6 +610,7 @@ class SwinTransformer(nn.Module):
         ape (bool): If True, add absolute position embedding to the patch embedding. Default: ``False``
         patch_norm (bool): If True, add normalization after patch embedding. Default: ``True``
         use_checkpoint (bool): Whether to use checkpointing to save memory. Default: ``False``
+        use_flash (bool): If True, use the fused attention kernel. Default: ``False``
     """
 
     def __init__(
@@ -581,6 +633,7 @@ class SwinTransformer(nn.Module):
         ape=False,
         patch_norm=True,
         use_checkpoint=False,
+        use_flash=False,
         **kwargs,
     ):
         super().__init__()
@@ -615,9 +668,7 @@ class SwinTransformer(nn.Module):
         self.pos_drop = nn.Dropout(p=drop_rate)
 
         # stochastic depth
-        dpr = [
-            x.item() for x in flow.linspace(0, drop_path_rate, sum(depths))
-        ]  # stochastic depth decay rule
+        dpr = drop_path_rates(drop_path_rate, sum(depths))
 
         # build layers
         self.layers = nn.ModuleList()
@@ -640,11 +691,11 @@ class SwinTransformer(nn.Module):
                 norm_layer=norm_layer,
                 downsample=PatchMerging if (i_layer < self.num_layers - 1) else None,
                 use_checkpoint=use_checkpoint,
+                use_flash=use_flash,
             )
             self.layers.append(layer)
 
         self.norm = norm_layer(self.num_features)
-        self.avgpool = nn.AdaptiveAvgPool1d(1)
         self.head = (
             nn.Linear(self.num_features, num_classes)
             if num_classes > 0
@@ -672,8 +723,7 @@ class SwinTransformer(nn.Module):
             x = layer(x)
 
         x = self.norm(x)  # B L C
-        x = self.avgpool(x.transpose(1, 2))  # B C 1
-        x = flow.flatten(x, 1)
+        x = x.mean(dim=1)  # B C
         return x
 
     def forward(self, x):
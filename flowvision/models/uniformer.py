@@ -10,7 +10,7 @@ import oneflow.nn as nn
 import oneflow.nn.functional as F
 
 from flowvision.data import IMAGENET_INCEPTION_MEAN, IMAGENET_INCEPTION_STD
-from flowvision.layers import trunc_normal_, DropPath
+from flowvision.layers import trunc_normal_, DropPath, drop_path_rates
 from .helpers import to_2tuple
 from .registry import ModelCreator
 from .utils import load_state_dict_from_url
@@ -386,9 +386,7 @@ class UniFormer(nn.Module):
             )
 
         self.pos_drop = nn.Dropout(p=drop_rate)
-        dpr = [
-            x.item() for x in flow.linspace(0, drop_path_rate, sum(depth))
-        ]  # stochastic depth decay rule
+        dpr = drop_path_rates(drop_path_rate, sum(depth))  # stochastic depth decay rule
         num_heads = [dim // head_dim for dim in embed_dim]
         self.blocks1 = nn.ModuleList(
             [
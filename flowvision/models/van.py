@@ -8,7 +8,7 @@ from functools import partial
 import oneflow as flow
 import oneflow.nn as nn
 
-from flowvision.layers import DropPath, trunc_normal_
+from flowvision.layers import DropPath, trunc_normal_, drop_path_rates
 from flowvision.models.helpers import to_2tuple
 from .utils import load_state_dict_from_url
 from .registry import ModelCreator
@@ -220,9 +220,8 @@ class VAN(nn.Module):
         self.depths = depths
         self.num_stages = num_stages
 
-        dpr = [
-            x.item() for x in flow.linspace(0, drop_path_rate, sum(depths))
-        ]  # stochastic depth decay rule
+        # stochastic depth decay rule
+        dpr = drop_path_rates(drop_path_rate, sum(depths))
         cur = 0
 
         for i in range(num_stages):
@@ -10,7 +10,15 @@ import oneflow as flow
 import oneflow.nn as nn
 import oneflow.nn.functional as F
 
-from flowvision.layers import trunc_normal_, lecun_normal_, PatchEmbed, Mlp, DropPath
+from flowvision.layers import (
+    trunc_normal_,
+    lecun_normal_,
+    PatchEmbed,
+    Mlp,
+    DropPath,
+    flash_attn_with_bias,
+    drop_path_rates,
+)
 from .helpers import named_apply
 from .utils import load_state_dict_from_url
 from .registry import ModelCreator
@@ -62,11 +70,20 @@ _logger = logging.getLogger(__name__)
 
 
 class Attention(nn.Module):
-    def __init__(self, dim, num_heads=8, qkv_bias=False, attn_drop=0.0, proj_drop=0.0):
+    def __init__(
+        self,
+        dim,
+        num_heads=8,
+        qkv_bias=False,
+        attn_drop=0.0,
+        proj_drop=0.0,
+        use_flash=False,
+    ):
         super().__init__()
         self.num_heads = num_heads
         head_dim = dim // num_heads
         self.scale = head_dim ** -0.5
+        self.use_flash = use_flash
 
         self.qkv = nn.Linear(dim, dim * 3, bias=qkv_bias)
         self.attn_drop = nn.Dropout(attn_drop)
@@ -84,11 +101,16 @@ class Attention(nn.Module):
         # q, k, v = qkv.unbind(0)
         q, k, v = qkv[0], qkv[1], qkv[2]
 
-        attn = (q @ k.transpose(-2, -1)) * self.scale
-        attn = attn.softmax(dim=-1)
-        attn = self.attn_drop(attn)
-
-        x = (attn @ v).transpose(1, 2).reshape(B, N, C)
+        x = flash_attn_with_bias(
+            q,
+            k,
+            v,
+            scale=self.scale,
+            dropout_p=self.attn_drop.p,
+            training=self.training,
+            use_fused=self.use_flash,
+        )
+        x = x.transpose(1, 2).reshape(B, N, C)
         x = self.proj(x)
         x = self.proj_drop(x)
         return x
@@ -106,6 +128,7 @@ class Block(nn.Module):
         drop_path=0.0,
         act_layer=nn.GELU,
         norm_layer=nn.LayerNorm,
+        use_flash=False,
     ):
         super().__init__()
         self.norm1 = norm_layer(dim)
@@ -115,6 +138,7 @@ class Block(nn.Module):
             qkv_bias=qkv_bias,
             attn_drop=attn_drop,
             proj_drop=drop,
+            use_flash=use_flash,
         )
         # NOTE: drop path for stochastic depth, we shall see if this is better than dropout here
         self.drop_path = DropPath(drop_path) if drop_path > 0.0 else nn.Identity()
@@ -161,6 +185,8 @@ class VisionTransformer(nn.Module):
         norm_layer=None,
         act_layer=None,
         weight_init="",
+        amp_dtype=None,
+        use_flash=False,
     ):
         """
         Args:
@@ -181,6 +207,9 @@ class VisionTransformer(nn.Module):
             embed_layer (nn.Module): patch embedding layer
             norm_layer: (nn.Module): normalization layer
             weight_init: (str): weight init scheme
+            amp_dtype: (Optional[flow.dtype]): if set, run CUDA inputs under autocast with this dtype, e.g. flow.bfloat16;
+                the logits are then returned in this reduced dtype, cast them with ``.float()`` if needed
+            use_flash: (bool): compute attention with the fused kernel of ``flash_attn_with_bias`` when available
         """
         super().__init__()
         self.num_classes = num_classes
@@ -188,6 +217,11 @@ class VisionTransformer(nn.Module):
             self.embed_dim
         ) = embed_dim  # num_features for consistency with other models
         self.num_tokens = 2 if distilled else 1
+        if amp_dtype is not None and not hasattr(flow, "autocast"):
+            raise RuntimeError(
+                "amp_dtype requires a OneFlow build that provides flow.autocast"
+            )
+        self.amp_dtype = amp_dtype
         norm_layer = norm_layer or partial(nn.LayerNorm, eps=1e-6)
         act_layer = act_layer or nn.GELU
 
@@ -208,9 +242,7 @@ class VisionTransformer(nn.Module):
         )
         self.pos_drop = nn.Dropout(p=drop_rate)
 
-        dpr = [
-            x.item() for x in flow.linspace(0, drop_path_rate, depth)
-        ]  # stochastic depth decay rule
+        dpr = drop_path_rates(drop_path_rate, depth)  # stochastic depth decay rule
         self.blocks = nn.Sequential(
             *[
                 Block(
@@ -223,6 +255,7 @@ class VisionTransformer(nn.Module):
                     drop_path=dpr[i],
                     norm_layer=norm_layer,
                     act_layer=act_layer,
+                    use_flash=use_flash,
                 )
                 for i in range(depth)
             ]
@@ -291,7 +324,9 @@ class VisionTransformer(nn.Module):
             x = flow.cat(
                 (cls_token, self.dist_token.expand(x.shape[0], -1, -1), x), dim=1
             )
-        x = self.pos_drop(x + self.pos_embed)
+        # x is freshly allocated by the cat, add the position embedding in place
+        x += self.pos_embed
+        x = self.pos_drop(x)
         # transformer encoder
         x = self.blocks(x)
         x = self.norm(x)
@@ -301,7 +336,7 @@ class VisionTransformer(nn.Module):
         else:
             return x[:, 0], x[:, 1]
 
-    def forward(self, x):
+    def _forward_impl(self, x):
         x = self.forward_features(x)
         # classification head
         if self.head_dist is not None:
@@ -315,6 +350,13 @@ class VisionTransformer(nn.Module):
             x = self.head(x)
         return x
 
+    def forward(self, x):
+        if self.amp_dtype is not None and x.is_cuda:
+            # matmuls run in amp_dtype, autocast keeps LayerNorm and softmax in float32
+            with flow.autocast(device_type="cuda", dtype=self.amp_dtype):
+                return self._forward_impl(x)
+        return self._forward_impl(x)
+
 
 def _init_vit_weights(
     module: nn.Module, name: str = "", head_bias: float = 0.0, jax_impl: bool = False
@@ -1,5 +1,9 @@
+import numpy as np
+import pytest
 import oneflow as flow
-from flowvision.layers.attention import SEModule
+import oneflow.nn.functional as F
+from flowvision.layers.attention import SEModule, flash_attn_with_bias
+from flowvision.layers.attention import flash_attn as flash_attn_module
 
 
 def test_se():
@@ -8,5 +12,42 @@ def test_se():
     assert se(x).shape == x.shape
 
 
+def _reference_attn(q, k, v, bias, scale):
+    attn = (flow.matmul(q, k.transpose(-2, -1)) * scale + bias).softmax(dim=-1)
+    return flow.matmul(attn, v)
+
+
+def test_flash_attn_with_bias_explicit():
+    q = flow.randn(2, 4, 49, 32)
+    k = flow.randn(2, 4, 49, 32)
+    v = flow.randn(2, 4, 49, 32)
+    bias = flow.randn(1, 4, 49, 49)
+    scale = 0.1
+    expected = _reference_attn(q, k, v, bias, scale)
+    out = flash_attn_with_bias(q, k, v, bias, scale=scale, use_fused=False)
+    assert out.shape == expected.shape
+    assert np.allclose(out.numpy(), expected.numpy(), atol=1e-5)
+
+
+@pytest.mark.skipif(
+    not flow.cuda.is_available() or not hasattr(F, "scaled_dot_product_attention"),
+    reason="fused scaled_dot_product_attention needs CUDA and a recent OneFlow",
+)
+def test_flash_attn_with_bias_fused(monkeypatch):
+    def _no_explicit(*args, **kwargs):
+        raise AssertionError("fused attention fell back to the explicit path")
+
+    monkeypatch.setattr(flash_attn_module, "_explicit_attn", _no_explicit)
+    q = flow.randn(2, 4, 49, 32, device="cuda")
+    k = flow.randn(2, 4, 49, 32, device="cuda")
+    v = flow.randn(2, 4, 49, 32, device="cuda")
+    bias = flow.randn(1, 4, 49, 49, device="cuda")
+    scale = 0.1
+    expected = _reference_attn(q, k, v, bias, scale)
+    out = flash_attn_with_bias(q, k, v, bias, scale=scale, use_fused=True)
+    assert np.allclose(out.cpu().numpy(), expected.cpu().numpy(), atol=1e-4)
+
+
 if __name__ == "__main__":
     test_se()
+    test_flash_attn_with_bias_explicit()
@@ -1,5 +1,6 @@
+import numpy as np
 import oneflow as flow
-from flowvision.layers.regularization import StochasticDepth
+from flowvision.layers.regularization import StochasticDepth, drop_path_rates
 
 
 def test_stochastic_depth(x, p=0.5, mode="row"):
@@ -7,6 +8,15 @@ def test_stochastic_depth(x, p=0.5, mode="row"):
     return stochastic_depth(x)
 
 
+def test_drop_path_rates():
+    for drop_path_rate, depth in [(0.1, 12), (0.3, 24), (0.2, 1), (0.0, 4)]:
+        expected = flow.linspace(0, drop_path_rate, depth).numpy()
+        rates = drop_path_rates(drop_path_rate, depth)
+        assert len(rates) == depth
+        assert np.allclose(rates, expected)
+
+
 if __name__ == "__main__":
     x = flow.randn(16, 3, 48, 48)
     test_stochastic_depth(x)
+    test_drop_path_rates()
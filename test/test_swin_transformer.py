@@ -0,0 +1,97 @@
+import numpy as np
+import oneflow as flow
+from flowvision.models.swin_transformer import (
+    SwinTransformer,
+    SwinTransformerBlock,
+    WindowAttention,
+    gen_relative_position_index,
+)
+
+
+def _meshgrid_relative_position_index(window_size):
+    # the original construction from the Swin reference implementation
+    coords_h = flow.arange(window_size[0])
+    coords_w = flow.arange(window_size[1])
+    coords = flow.stack(flow.meshgrid(*[coords_h, coords_w]))
+    coords_flatten = flow.flatten(coords, 1)
+    relative_coords = coords_flatten[:, :, None] - coords_flatten[:, None, :]
+    relative_coords = relative_coords.permute(1, 2, 0)
+    relative_coords[:, :, 0] += window_size[0] - 1
+    relative_coords[:, :, 1] += window_size[1] - 1
+    relative_coords[:, :, 0] *= 2 * window_size[1] - 1
+    return relative_coords.sum(-1)
+
+
+def test_gen_relative_position_index():
+    for window_size in [(7, 7), (3, 5), (5, 2), (1, 4)]:
+        expected = _meshgrid_relative_position_index(window_size)
+        index = gen_relative_position_index(window_size)
+        assert index.shape == expected.shape
+        assert np.array_equal(index.numpy().astype(np.int64), expected.numpy())
+
+
+def test_swin_use_flash_parity_with_shifted_window_mask():
+    device = "cuda" if flow.cuda.is_available() else "cpu"
+    kwargs = dict(
+        dim=32, input_resolution=(14, 14), num_heads=2, window_size=7, shift_size=3
+    )
+    block = SwinTransformerBlock(use_flash=False, **kwargs).to(device).eval()
+    block_flash = SwinTransformerBlock(use_flash=True, **kwargs).to(device).eval()
+    block_flash.load_state_dict(block.state_dict())
+    # 4 windows per image, so the window mask is folded into the head axis
+    x = flow.randn(2, 14 * 14, 32, device=device)
+    with flow.no_grad():
+        expected = block(x)
+        out = block_flash(x)
+    assert np.allclose(out.cpu().numpy(), expected.cpu().numpy(), atol=1e-4)
+
+
+def test_load_int64_relative_position_index():
+    attn = WindowAttention(32, window_size=(7, 7), num_heads=2)
+    state_dict = attn.state_dict()
+    expected = attn.relative_position_index.numpy()
+    state_dict["relative_position_index"] = _meshgrid_relative_position_index((7, 7))
+    assert state_dict["relative_position_index"].dtype == flow.int64
+    attn.load_state_dict(state_dict)
+    assert attn.relative_position_index.dtype == flow.int32
+    assert np.array_equal(attn.relative_position_index.numpy(), expected)
+
+
+def test_swin_to_device():
+    model = SwinTransformer(
+        img_size=56, embed_dim=32, depths=[1, 1], num_heads=[2, 4], num_classes=10
+    )
+    model = model.to("cpu").eval()
+    with flow.no_grad():
+        assert model(flow.randn(1, 3, 56, 56)).shape == (1, 10)
+
+
+def test_rel_pos_bias_follows_in_place_table_update():
+    # e.g. ModelEmaV2 updates an eval() model with copy_ under no_grad
+    attn = WindowAttention(32, window_size=(7, 7), num_heads=2).eval()
+    x = flow.randn(4, 49, 32)
+    with flow.no_grad():
+        before = attn(x).numpy()
+        attn.relative_position_bias_table.copy_(
+            flow.randn(*attn.relative_position_bias_table.shape)
+        )
+        bias = attn._get_rel_pos_bias()
+        expected = (
+            attn.relative_position_bias_table[
+                attn.relative_position_index.view(-1).to(flow.int64)
+            ]
+            .view(49, 49, -1)
+            .permute(2, 0, 1)
+            .unsqueeze(0)
+        )
+        after = attn(x).numpy()
+    assert np.allclose(bias.numpy(), expected.numpy())
+    assert not np.allclose(before, after)
+
+
+if __name__ == "__main__":
+    test_gen_relative_position_index()
+    test_load_int64_relative_position_index()
+    test_swin_to_device()
+    test_rel_pos_bias_follows_in_place_table_update()
+    test_swin_use_flash_parity_with_shifted_window_mask()
@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+import oneflow as flow
+import oneflow.nn.functional as F
+from flowvision.layers.attention import flash_attn as flash_attn_module
+from flowvision.models.vision_transformer import VisionTransformer
+from flowvision.models.deit_III import (
+    vit_models,
+    Layer_scale_init_Block,
+    Layer_scale_init_Block_paralx2,
+)
+
+requires_fused_attn = pytest.mark.skipif(
+    not flow.cuda.is_available() or not hasattr(F, "scaled_dot_product_attention"),
+    reason="fused scaled_dot_product_attention needs CUDA and a recent OneFlow",
+)
+
+
+def _assert_same_output(model, model_flash, monkeypatch):
+    model = model.to("cuda").eval()
+    model_flash = model_flash.to("cuda").eval()
+    model_flash.load_state_dict(model.state_dict())
+    x = flow.randn(2, 3, 32, 32, device="cuda")
+    with flow.no_grad():
+        expected = model(x)
+
+    def _no_explicit(*args, **kwargs):
+        raise AssertionError("fused attention fell back to the explicit path")
+
+    monkeypatch.setattr(flash_attn_module, "_explicit_attn", _no_explicit)
+    with flow.no_grad():
+        out = model_flash(x)
+    assert np.allclose(out.cpu().numpy(), expected.cpu().numpy(), atol=1e-4)
+
+
+@requires_fused_attn
+def test_vit_use_flash_parity(monkeypatch):
+    kwargs = dict(
+        img_size=32, patch_size=16, embed_dim=64, depth=2, num_heads=4, num_classes=10
+    )
+    _assert_same_output(
+        VisionTransformer(use_flash=False, **kwargs),
+        VisionTransformer(use_flash=True, **kwargs),
+        monkeypatch,
+    )
+
+
+@requires_fused_attn
+def test_deit_3_use_flash_parity(monkeypatch):
+    kwargs = dict(
+        img_size=32, patch_size=16, embed_dim=64, depth=2, num_heads=4, num_classes=10
+    )
+    _assert_same_output(
+        vit_models(**kwargs), vit_models(use_flash=True, **kwargs), monkeypatch
+    )
+
+
+def test_vit_default_amp_dtype_forward_unchanged():
+    model = VisionTransformer(
+        img_size=32, patch_size=16, embed_dim=64, depth=2, num_heads=4, num_classes=10
+    ).eval()
+    assert model.amp_dtype is None
+    x = flow.randn(2, 3, 32, 32)
+    with flow.no_grad():
+        out = model(x)
+        expected = model._forward_impl(x)
+    assert out.dtype == flow.float32
+    assert np.allclose(out.numpy(), expected.numpy())
+
+
+def _layer_scale_reference(block, x):
+    x = x + block.drop_path(block.gamma_1 * block.attn(block.norm1(x)))
+    x = x + block.drop_path(block.gamma_2 * block.mlp(block.norm2(x)))
+    return x
+
+
+def _layer_scale_paralx2_reference(block, x):
+    x = (
+        x
+        + block.drop_path(block.gamma_1 * block.attn(block.norm1(x)))
+        + block.drop_path(block.gamma_1_1 * block.attn1(block.norm11(x)))
+    )
+    x = (
+        x
+        + block.drop_path(block.gamma_2 * block.mlp(block.norm2(x)))
+        + block.drop_path(block.gamma_2_1 * block.mlp1(block.norm21(x)))
+    )
+    return x
+
+
+@pytest.mark.parametrize(
+    "block_cls, reference",
+    [
+        (Layer_scale_init_Block, _layer_scale_reference),
+        (Layer_scale_init_Block_paralx2, _layer_scale_paralx2_reference),
+    ],
+)
+@pytest.mark.parametrize("training", [False, True])
+def test_layer_scale_block_matches_reference(block_cls, reference, training):
+    block = block_cls(64, num_heads=4, drop_path=0.0, init_values=0.1)
+    with flow.no_grad():
+        for name, param in block.named_parameters():
+            if name.startswith("gamma"):
+                param.copy_(flow.randn(*param.shape))
+    block.train(training)
+    x = flow.randn(2, 5, 64)
+    with flow.no_grad():
+        out = block(x)
+        expected = reference(block, x)
+    assert np.allclose(out.numpy(), expected.numpy(), atol=1e-5)
+
+
+@pytest.mark.skipif(
+    not flow.cuda.is_available() or not hasattr(flow, "autocast"),
+    reason="amp_dtype needs CUDA and flow.autocast",
+)
+def test_vit_bf16_amp_dtype_close_to_fp32():
+    model = VisionTransformer(
+        img_size=32,
+        patch_size=16,
+        embed_dim=64,
+        depth=2,
+        num_heads=4,
+        num_classes=10,
+        amp_dtype=flow.bfloat16,
+    )
+    model = model.to("cuda").eval()
+    x = flow.randn(2, 3, 32, 32, device="cuda")
+    with flow.no_grad():
+        out = model(x)
+        expected = model._forward_impl(x)
+    assert out.dtype == flow.bfloat16
+    assert expected.dtype == flow.float32
+    assert np.allclose(
+        out.float().cpu().numpy(), expected.cpu().numpy(), atol=5e-2, rtol=5e-2
+    )
+
+
+@pytest.mark.skipif(hasattr(flow, "autocast"), reason="flow.autocast is available")
+def test_vit_amp_dtype_requires_autocast():
+    with pytest.raises(RuntimeError):
+        VisionTransformer(
+            img_size=32, patch_size=16, depth=1, num_classes=10, amp_dtype=flow.float16
+        )
+
+
+if __name__ == "__main__":
+    test_vit_default_amp_dtype_forward_unchanged()